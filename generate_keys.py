@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""Generate a signing keypair for Deep-Live-Cam output provenance"""
+
+import argparse
+import os
+
+from modules.digital_signature import DigitalSigner
+
+
+def main() -> None:
+    program = argparse.ArgumentParser(description='generate a keypair for signing outputs')
+    program.add_argument('-o', '--output-dir', help='directory to write the key files to', dest='output_dir', default='keys')
+    program.add_argument('--algorithm', help='signing algorithm', dest='algorithm', default='ECDSA', choices=['ECDSA', 'RSA'])
+    program.add_argument('--password', help='password to encrypt the private key', dest='password', default=None)
+    args = program.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    private_key_path = os.path.join(args.output_dir, 'private_key.pem')
+    public_key_path = os.path.join(args.output_dir, 'public_key.pem')
+
+    signer = DigitalSigner(algorithm=args.algorithm)
+    signer.generate_keypair()
+    password = args.password.encode('utf-8') if args.password else None
+    signer.save_private_key(private_key_path, password=password)
+    signer.save_public_key(public_key_path)
+
+    print(f'Generated {args.algorithm} keypair:')
+    print(f'  private key: {private_key_path}')
+    print(f'  public key:  {public_key_path}')
+    print(f'  fingerprint: {signer.get_public_key_fingerprint()}')
+
+
+if __name__ == '__main__':
+    main()
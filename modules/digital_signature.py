@@ -0,0 +1,456 @@
+import base64
+import binascii
+import functools
+import hashlib
+import json
+import mmap
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, padding, rsa, utils as asym_utils
+
+import modules.metadata
+
+from modules.typing import Frame
+
+PublicKey = Union[ec.EllipticCurvePublicKey, rsa.RSAPublicKey]
+PrivateKey = Union[ec.EllipticCurvePrivateKey, rsa.RSAPrivateKey]
+
+SIGNATURE_EXTENSION = '.sig'
+# magic prefix of the binary .sig container; legacy files are plain JSON
+SIG_MAGIC = b'DLCS'
+SIG_HEADER_V1 = '<4sBBBHI'
+SIG_HEADER = '<4sBBBBHI'
+# v3 appends the raw 32-byte payload SHA256 after the fingerprint
+SIG_VERSION = 3
+
+
+class MalformedSignatureError(ValueError):
+    """Raised when a .sig sidecar is truncated or otherwise unparseable"""
+
+
+def canonical_metadata_bytes(metadata: Dict[str, Any]) -> bytes:
+    """Canonical encoding of metadata as included in signed payloads"""
+    return json.dumps(metadata, sort_keys=True).encode('utf-8')
+
+
+def _pack_signature_file(sig_data: Dict[str, Any]) -> bytes:
+    algorithm = sig_data['algorithm'].encode('ascii')
+    padding_scheme = sig_data['padding'].encode('ascii')
+    fingerprint = sig_data['key_fingerprint'].encode('ascii')
+    signature: bytes = sig_data['signature']
+    metadata_bytes = json.dumps(sig_data['metadata'], sort_keys=True, separators=(',', ':')).encode('utf-8')
+    payload_sha256: bytes = sig_data['payload_sha256']
+    header = struct.pack(
+        SIG_HEADER, SIG_MAGIC, sig_data['version'],
+        len(algorithm), len(padding_scheme), len(fingerprint), len(signature), len(metadata_bytes),
+    )
+    return b''.join([header, algorithm, padding_scheme, fingerprint, payload_sha256, signature, metadata_bytes])
+
+
+def _unpack_signature_file(blob: bytes) -> Dict[str, Any]:
+    if len(blob) < struct.calcsize(SIG_HEADER_V1):
+        raise MalformedSignatureError('signature file truncated')
+    version = blob[4]
+    if version >= 2:
+        if len(blob) < struct.calcsize(SIG_HEADER):
+            raise MalformedSignatureError('signature file truncated')
+        _, version, algorithm_len, padding_len, fingerprint_len, signature_len, metadata_len = struct.unpack_from(SIG_HEADER, blob)
+        offset = struct.calcsize(SIG_HEADER)
+    else:
+        _, version, algorithm_len, fingerprint_len, signature_len, metadata_len = struct.unpack_from(SIG_HEADER_V1, blob)
+        padding_len = 0
+        offset = struct.calcsize(SIG_HEADER_V1)
+    sha256_len = 32 if version >= 3 else 0
+    if len(blob) < offset + algorithm_len + padding_len + fingerprint_len + sha256_len + signature_len + metadata_len:
+        raise MalformedSignatureError('signature file shorter than its declared field lengths')
+    try:
+        algorithm = blob[offset:offset + algorithm_len].decode('ascii')
+        offset += algorithm_len
+        padding_scheme = blob[offset:offset + padding_len].decode('ascii') or 'PSS'
+        offset += padding_len
+        fingerprint = blob[offset:offset + fingerprint_len].decode('ascii')
+        offset += fingerprint_len
+        payload_sha256 = None
+        if version >= 3:
+            payload_sha256 = blob[offset:offset + 32]
+            offset += 32
+        signature = blob[offset:offset + signature_len]
+        offset += signature_len
+        metadata = json.loads(blob[offset:offset + metadata_len])
+    except (UnicodeDecodeError, ValueError) as error:
+        raise MalformedSignatureError('signature file contents unparseable') from error
+    return {
+        'version': version,
+        'algorithm': algorithm,
+        'padding': padding_scheme,
+        'signature': signature,
+        'metadata': metadata,
+        'key_fingerprint': fingerprint,
+        'payload_sha256': payload_sha256,
+    }
+
+
+@functools.lru_cache(maxsize=16)
+def _load_public_key_cached(filepath: str, mtime_ns: int) -> PublicKey:
+    with open(filepath, 'rb') as f:
+        return serialization.load_pem_public_key(f.read())
+
+
+@functools.lru_cache(maxsize=16)
+def _load_private_key_cached(filepath: str, mtime_ns: int, password: Optional[bytes]) -> PrivateKey:
+    with open(filepath, 'rb') as f:
+        return serialization.load_pem_private_key(f.read(), password=password)
+
+
+def _payload_digest(data: bytes, metadata_bytes: Optional[bytes]) -> bytes:
+    # Feed the hash incrementally - no data + metadata_bytes copy of the payload
+    digest = hashes.Hash(hashes.SHA256())
+    digest.update(data)
+    if metadata_bytes is not None:
+        digest.update(metadata_bytes)
+    return digest.finalize()
+
+
+class DigitalSigner:
+    """Signs output files and verifies signatures using ECDSA or RSA.
+
+    ECDSA on P-256 is the default - sign throughput is several times higher
+    than RSA-2048 and verification speed is comparable.
+    """
+
+    def __init__(self, algorithm: str = 'ECDSA', padding_scheme: str = 'PSS') -> None:
+        self.algorithm = algorithm
+        # RSA only: PKCS1v15 is deterministic and skips the per-sign MGF1
+        # work of PSS; ECDSA ignores this
+        self.padding_scheme = padding_scheme
+        self.private_key: Optional[PrivateKey] = None
+        self.public_key: Optional[PublicKey] = None
+        self._fingerprint: Optional[str] = None
+
+    def generate_keypair(self) -> None:
+        if self.algorithm == 'ECDSA':
+            self.private_key = ec.generate_private_key(ec.SECP256R1())
+        elif self.algorithm == 'RSA':
+            self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        else:
+            raise ValueError(f'Unsupported algorithm: {self.algorithm}')
+        self.public_key = self.private_key.public_key()
+        self._fingerprint = None
+
+    def sign_data(self, data: bytes, metadata: Optional[Dict[str, Any]] = None, *,
+                  metadata_bytes: Optional[bytes] = None) -> str:
+        """Sign data (plus optional metadata) and return the signature as base64.
+
+        Callers that already hold the canonical metadata encoding can pass
+        metadata_bytes to skip the json.dumps here.
+        """
+        if self.private_key is None:
+            raise ValueError('No private key loaded')
+        if metadata_bytes is None and metadata is not None:
+            metadata_bytes = canonical_metadata_bytes(metadata)
+        signature = self._sign_digest(_payload_digest(data, metadata_bytes))
+        return base64.b64encode(signature).decode('ascii')
+
+    def _sign_digest(self, digest: bytes) -> bytes:
+        if self.algorithm == 'ECDSA':
+            return self.private_key.sign(digest, ec.ECDSA(asym_utils.Prehashed(hashes.SHA256())))
+        return self.private_key.sign(
+            digest,
+            self._rsa_padding(),
+            asym_utils.Prehashed(hashes.SHA256()),
+        )
+
+    def verify_signature(self, data: bytes, signature: Union[str, bytes], metadata: Optional[Dict[str, Any]] = None, *,
+                         metadata_bytes: Optional[bytes] = None) -> bool:
+        """Verify a signature given as raw bytes or base64 text"""
+        if self.public_key is None:
+            raise ValueError('No public key loaded')
+        if metadata_bytes is None and metadata is not None:
+            metadata_bytes = canonical_metadata_bytes(metadata)
+        return self._verify_digest(_payload_digest(data, metadata_bytes), signature)
+
+    def verify_signature_stream(self, file_obj: BinaryIO, signature: Union[str, bytes], metadata: Optional[Dict[str, Any]] = None, *,
+                                metadata_bytes: Optional[bytes] = None) -> bool:
+        """Verify a signature over a file object without loading it into RAM"""
+        if self.public_key is None:
+            raise ValueError('No public key loaded')
+        if metadata_bytes is None and metadata is not None:
+            metadata_bytes = canonical_metadata_bytes(metadata)
+        digest = hashes.Hash(hashes.SHA256())
+        while chunk := file_obj.read(1 << 20):
+            digest.update(chunk)
+        if metadata_bytes is not None:
+            digest.update(metadata_bytes)
+        return self._verify_digest(digest.finalize(), signature)
+
+    def _verify_digest(self, digest: bytes, signature: Union[str, bytes]) -> bool:
+        if not isinstance(signature, bytes):
+            # sidecars are untrusted - a non-base64 or non-string value is
+            # an invalid signature, not an error
+            try:
+                signature = base64.b64decode(signature)
+            except (binascii.Error, TypeError):
+                return False
+        try:
+            if self.algorithm == 'ECDSA':
+                # a key of the wrong type cannot validate the signature, and
+                # calling verify() with mismatched arguments raises TypeError
+                if not isinstance(self.public_key, ec.EllipticCurvePublicKey):
+                    return False
+                self.public_key.verify(signature, digest, ec.ECDSA(asym_utils.Prehashed(hashes.SHA256())))
+            else:
+                if not isinstance(self.public_key, rsa.RSAPublicKey):
+                    return False
+                self.public_key.verify(
+                    signature,
+                    digest,
+                    self._rsa_padding(),
+                    asym_utils.Prehashed(hashes.SHA256()),
+                )
+            return True
+        except InvalidSignature:
+            return False
+
+    def _rsa_padding(self) -> padding.AsymmetricPadding:
+        if self.padding_scheme == 'PKCS1v15':
+            return padding.PKCS1v15()
+        return padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH)
+
+    def sign_batch(self, frames: List[Frame]) -> Tuple[str, list]:
+        """Sign a batch of frames with a single asymmetric op over a Merkle root.
+
+        Each frame only costs one SHA256; the returned tree lets a verifier
+        prove any single frame against the root signature via merkle_proof.
+        """
+        if not frames:
+            raise ValueError('sign_batch needs at least one frame')
+        leaves = [hashlib.sha256(frame).digest() for frame in frames]
+        tree = self._build_merkle_tree(leaves)
+        root_signature = self.sign_data(tree[-1][0])
+        return root_signature, tree
+
+    @staticmethod
+    def _build_merkle_tree(leaves: list) -> list:
+        levels = [list(leaves)]
+        while len(levels[-1]) > 1:
+            level = levels[-1]
+            if len(level) % 2:
+                level = level + [level[-1]]
+            levels.append([
+                hashlib.sha256(level[i] + level[i + 1]).digest()
+                for i in range(0, len(level), 2)
+            ])
+        return levels
+
+    @staticmethod
+    def merkle_proof(tree: list, index: int) -> list:
+        """Return the audit path for the leaf at index as (sibling, is_left) pairs"""
+        proof = []
+        for level in tree[:-1]:
+            if len(level) % 2:
+                level = level + [level[-1]]
+            sibling = index ^ 1
+            proof.append((level[sibling], sibling < index))
+            index //= 2
+        return proof
+
+    def verify_frame_in_batch(self, frame: Frame, proof: list, root_signature: str) -> bool:
+        """Verify one frame against a batch root signature using its audit path"""
+        node = hashlib.sha256(frame).digest()
+        for sibling, is_left in proof:
+            node = hashlib.sha256(sibling + node if is_left else node + sibling).digest()
+        return self.verify_signature(node, root_signature)
+
+    def get_public_key_fingerprint(self) -> str:
+        if self.public_key is None:
+            raise ValueError('No public key loaded')
+        if self._fingerprint is None:
+            # DER is the canonical binary form - no base64 round-trip like PEM
+            der = self.public_key.public_bytes(
+                serialization.Encoding.DER,
+                serialization.PublicFormat.SubjectPublicKeyInfo,
+            )
+            self._fingerprint = hashlib.sha256(der).hexdigest()[:16]
+        return self._fingerprint
+
+    def save_private_key(self, filepath: str, password: Optional[bytes] = None) -> None:
+        if password:
+            encryption: serialization.KeySerializationEncryption = serialization.BestAvailableEncryption(password)
+        else:
+            encryption = serialization.NoEncryption()
+        pem = self.private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            encryption,
+        )
+        # create with 0600 directly - no window where the key is world-readable
+        fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        # the mode above only applies on creation; clamp pre-existing files
+        # so overwriting a key never keeps looser permissions
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(pem)
+
+    def save_public_key(self, filepath: str) -> None:
+        pem = self.public_key.public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        with open(filepath, 'wb') as f:
+            f.write(pem)
+
+    def load_private_key(self, filepath: str, password: Optional[bytes] = None) -> None:
+        # mtime in the cache key makes reloading after a key rotation safe
+        self.private_key = _load_private_key_cached(filepath, os.stat(filepath).st_mtime_ns, password)
+        self.public_key = self.private_key.public_key()
+        self.algorithm = 'ECDSA' if isinstance(self.private_key, ec.EllipticCurvePrivateKey) else 'RSA'
+        self._fingerprint = None
+
+    def load_public_key(self, filepath: str) -> None:
+        self.public_key = _load_public_key_cached(filepath, os.stat(filepath).st_mtime_ns)
+        self.algorithm = 'ECDSA' if isinstance(self.public_key, ec.EllipticCurvePublicKey) else 'RSA'
+        self._fingerprint = None
+
+
+# top-level so they pickle for ProcessPoolExecutor; the lru_cached key
+# loaders keep the PEM parse to one per worker process
+def _verify_worker(image_path: str, public_key_path: str) -> Tuple[str, bool, Dict[str, Any]]:
+    is_valid, sig_data = SignatureManager.verify_image_file(image_path, public_key_path)
+    return image_path, is_valid, sig_data
+
+
+def _sign_worker(image_path: str, private_key_path: str, metadata: Optional[Dict[str, Any]],
+                 padding_scheme: str) -> Tuple[str, str]:
+    return image_path, SignatureManager.create_signature_file(image_path, private_key_path, metadata, padding_scheme)
+
+
+class SignatureManager:
+    """Creates and verifies .sig sidecar files next to signed outputs"""
+
+    @staticmethod
+    def get_signature_path(image_path: str) -> str:
+        return image_path + SIGNATURE_EXTENSION
+
+    @staticmethod
+    def create_signature_file(image_path: str, private_key_path: str, metadata: Optional[Dict[str, Any]] = None,
+                              padding_scheme: str = 'PSS') -> str:
+        signer = DigitalSigner(padding_scheme=padding_scheme)
+        signer.load_private_key(private_key_path)
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        sig_metadata = {
+            'file': os.path.basename(image_path),
+            'tool': modules.metadata.name,
+            'version': modules.metadata.version,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+        }
+        if metadata:
+            sig_metadata.update(metadata)
+        metadata_bytes = canonical_metadata_bytes(sig_metadata)
+        digest = _payload_digest(data, metadata_bytes)
+        sig_data = {
+            'version': SIG_VERSION,
+            'algorithm': signer.algorithm,
+            'padding': signer.padding_scheme,
+            'signature': signer._sign_digest(digest),
+            'metadata': sig_metadata,
+            'key_fingerprint': signer.get_public_key_fingerprint(),
+            'payload_sha256': digest,
+        }
+        sig_path = SignatureManager.get_signature_path(image_path)
+        with open(sig_path, 'wb') as f:
+            f.write(_pack_signature_file(sig_data))
+        return sig_path
+
+    @staticmethod
+    def load_signature_file(image_path: str) -> Dict[str, Any]:
+        sig_path = SignatureManager.get_signature_path(image_path)
+        with open(sig_path, 'rb') as f:
+            blob = f.read()
+        if blob.startswith(SIG_MAGIC):
+            return _unpack_signature_file(blob)
+        # legacy JSON sidecar - signature stays base64 text
+        try:
+            sig_data = json.loads(blob)
+        except ValueError as error:
+            raise MalformedSignatureError('signature file is neither binary nor legacy JSON') from error
+        if not isinstance(sig_data, dict):
+            raise MalformedSignatureError('legacy signature file is not a JSON object')
+        if not isinstance(sig_data.get('signature'), str):
+            raise MalformedSignatureError('legacy signature file is missing a signature string')
+        return sig_data
+
+    @staticmethod
+    def load_public_key(public_key_path: str) -> PublicKey:
+        """Parse a public key once so batch callers can reuse the object"""
+        return _load_public_key_cached(public_key_path, os.stat(public_key_path).st_mtime_ns)
+
+    @staticmethod
+    def verify_image_file(image_path: str, public_key_path: str) -> Tuple[bool, Dict[str, Any]]:
+        """Return (is_valid, sig_data) for a signed image"""
+        return SignatureManager.verify_image_file_with_key(
+            image_path, SignatureManager.load_public_key(public_key_path)
+        )
+
+    @staticmethod
+    def verify_image_file_with_key(image_path: str, public_key: PublicKey) -> Tuple[bool, Dict[str, Any]]:
+        """Like verify_image_file, but takes an already-parsed public key"""
+        try:
+            sig_data = SignatureManager.load_signature_file(image_path)
+        except MalformedSignatureError:
+            # a corrupted sidecar is an invalid signature, not a crash
+            return False, {}
+        signer = DigitalSigner(algorithm=sig_data.get('algorithm', 'ECDSA'),
+                               padding_scheme=sig_data.get('padding', 'PSS'))
+        signer.public_key = public_key
+        metadata = sig_data.get('metadata')
+        metadata_bytes = canonical_metadata_bytes(metadata) if metadata is not None else None
+        digest = hashes.Hash(hashes.SHA256())
+        with open(image_path, 'rb') as f:
+            try:
+                # zero-copy: the kernel pages the file in as the hash walks it
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    digest.update(mapped)
+            except (ValueError, OSError):
+                # mmap rejects empty files; fall back to chunked reads
+                while chunk := f.read(1 << 20):
+                    digest.update(chunk)
+        if metadata_bytes is not None:
+            digest.update(metadata_bytes)
+        payload_digest = digest.finalize()
+        # fail fast on trivially corrupted payloads - a SHA256 compare is
+        # orders of magnitude cheaper than the asymmetric verify
+        stored_digest = sig_data.get('payload_sha256')
+        if stored_digest is not None and payload_digest != stored_digest:
+            return False, sig_data
+        is_valid = signer._verify_digest(payload_digest, sig_data['signature'])
+        return is_valid, sig_data
+
+    @staticmethod
+    def verify_many(image_paths: List[str], public_key_path: str,
+                    workers: Optional[int] = None) -> List[Tuple[str, bool, Dict[str, Any]]]:
+        """Verify a batch of signed images across processes"""
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(image_paths) <= 1:
+            return [_verify_worker(path, public_key_path) for path in image_paths]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_verify_worker, image_paths, [public_key_path] * len(image_paths)))
+
+    @staticmethod
+    def sign_many(image_paths: List[str], private_key_path: str, metadata: Optional[Dict[str, Any]] = None,
+                  padding_scheme: str = 'PSS', workers: Optional[int] = None) -> List[Tuple[str, str]]:
+        """Sign a batch of images across processes, returning (path, sig_path) pairs"""
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(image_paths) <= 1:
+            return [_sign_worker(path, private_key_path, metadata, padding_scheme) for path in image_paths]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            count = len(image_paths)
+            return list(executor.map(
+                _sign_worker, image_paths, [private_key_path] * count, [metadata] * count, [padding_scheme] * count
+            ))
@@ -63,6 +63,9 @@ mask_feather_ratio: int = 12       # Denominator for feathering calculation (hig
 mask_down_size: float = 0.1        # Expansion factor for lower lip mask (relative)
 mask_size: float = 1.0             # Expansion factor for upper lip mask (relative)
 
+# Watermark Options
+watermark_strength: float = 0.1   # Max fraction of pixels carrying watermark payload bits
+
 # --- START: Added for Frame Interpolation ---
 enable_interpolation: bool = True # Toggle temporal smoothing
 interpolation_weight: float = 0  # Blend weight for current frame (0.0-1.0). Lower=smoother.
@@ -0,0 +1,210 @@
+import functools
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import modules.globals
+import modules.metadata
+
+from modules.typing import Frame
+
+# Fixed seed so the extractor regenerates the same embedding positions
+WATERMARK_SEED = 42
+# Fixed payload size in bits - metadata JSON is padded/truncated to this
+PAYLOAD_BITS = 4096
+# 128-bit marker written into reserved blue-channel LSBs so verification can
+# reject non-watermarked images without extracting the payload
+TAG_BITS = 128
+WATERMARK_TAG = np.unpackbits(np.frombuffer(
+    hashlib.sha256(f'{modules.metadata.name} watermark'.encode('utf-8')).digest()[:TAG_BITS // 8],
+    dtype=np.uint8,
+))
+
+
+@functools.lru_cache(maxsize=8)
+def _tag_positions(height: int, width: int) -> Tuple[np.ndarray, np.ndarray]:
+    # the last TAG_BITS flat indices; _embedding_positions never draws these
+    flat = np.arange(height * width - TAG_BITS, height * width)
+    return np.divmod(flat, width)
+
+
+@functools.lru_cache(maxsize=32)
+def _file_hash_cached(filepath: str, mtime_ns: int, size: int) -> str:
+    # mtime/size key the cache so edits to the file invalidate the entry
+    with open(filepath, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        # streaming fallback for Python < 3.11 - never load the whole file
+        digest = hashlib.sha256()
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+
+class DeepfakeWatermark:
+    """Embeds and verifies an invisible provenance watermark in output frames.
+
+    The payload (a JSON metadata string) is written into the channel LSBs of
+    pseudo-random pixels derived from a fixed seed, so extraction needs no
+    side information.
+    """
+
+    def __init__(self, strength: float = 0.1) -> None:
+        # Maximum fraction of pixels that may carry payload bits
+        self.strength = strength
+        # (height, width, n) -> flat embedding positions; every frame of a
+        # video shares the same geometry, so positions are computed once
+        self._pos_cache: Dict[Tuple[int, int, int], np.ndarray] = {}
+
+    def embed_watermark_dct(self, image: Frame, watermark_text: str, inplace: bool = False) -> Frame:
+        """Embed the watermark, copying the image unless inplace is set"""
+        height, width = image.shape[:2]
+        watermark_bits = self._string_to_binary(watermark_text, PAYLOAD_BITS)
+        n = watermark_bits.size
+        # Pack 3 payload bits per pixel - one per channel LSB - so only a
+        # third of the pixels (and positions) are touched
+        n_pixels = (n + 2) // 3
+        if n_pixels > int(height * width * self.strength):
+            raise ValueError(
+                f"Image too small to carry {n} watermark bits at strength {self.strength}"
+            )
+        watermarked = image if inplace else image.copy()
+        if n_pixels * 3 > n:
+            watermark_bits = np.concatenate([watermark_bits, np.zeros(n_pixels * 3 - n, dtype=np.uint8)])
+        triplets = watermark_bits.reshape(n_pixels, 3)
+        ys, xs = np.divmod(self._embedding_positions(height, width, n_pixels), width)
+        watermarked[ys, xs, :] = (watermarked[ys, xs, :] & np.uint8(0xFE)) | triplets
+        tag_ys, tag_xs = _tag_positions(height, width)
+        watermarked[tag_ys, tag_xs, 0] = (watermarked[tag_ys, tag_xs, 0] & np.uint8(0xFE)) | WATERMARK_TAG
+        return watermarked
+
+    def extract_watermark_dct(self, image: Frame, num_bits: int = PAYLOAD_BITS) -> str:
+        """Extract the embedded payload string from a watermarked image"""
+        height, width = image.shape[:2]
+        n_pixels = (num_bits + 2) // 3
+        ys, xs = np.divmod(self._embedding_positions(height, width, n_pixels), width)
+        bits = (image[ys, xs, :] & 1).reshape(-1)[:num_bits]
+        return self._binary_to_string(bits)
+
+    def generate_watermark_data(self, source_path: Optional[str], target_path: Optional[str]) -> str:
+        metadata = {
+            'tool': modules.metadata.name,
+            'version': modules.metadata.version,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'source_hash': self._file_hash(source_path),
+            'target_hash': self._file_hash(target_path),
+        }
+        return json.dumps(metadata, sort_keys=True)
+
+    def verify_watermark(self, image: Frame) -> Tuple[bool, Dict[str, Any]]:
+        """Return (is_watermarked, metadata) for the given image"""
+        # a 128-bit LSB compare is orders of magnitude cheaper than payload
+        # extraction - bail out early on non-watermarked input
+        if not self._has_tag(image):
+            return False, {}
+        try:
+            watermark_text = self.extract_watermark_dct(image)
+        except ValueError:
+            # image too small to hold a payload at all
+            return False, {}
+        return self._parse_payload(watermark_text)
+
+    def verify_batch(self, images: List[Frame]) -> List[Tuple[bool, Dict[str, Any]]]:
+        """Verify many images at once, sharing position tables per shape.
+
+        Results keep the input order; images of the same geometry reuse one
+        set of embedding positions instead of deriving them per call.
+        """
+        results: List[Tuple[bool, Dict[str, Any]]] = [(False, {})] * len(images)
+        groups: Dict[Tuple[int, int], List[int]] = {}
+        for index, image in enumerate(images):
+            groups.setdefault((image.shape[0], image.shape[1]), []).append(index)
+        n_pixels = (PAYLOAD_BITS + 2) // 3
+        for (height, width), indices in groups.items():
+            try:
+                ys, xs = np.divmod(self._embedding_positions(height, width, n_pixels), width)
+            except ValueError:
+                continue
+            for index in indices:
+                if not self._has_tag(images[index]):
+                    continue
+                bits = (images[index][ys, xs, :] & 1).reshape(-1)[:PAYLOAD_BITS]
+                results[index] = self._parse_payload(self._binary_to_string(bits))
+        return results
+
+    def _has_tag(self, image: Frame) -> bool:
+        height, width = image.shape[:2]
+        if height * width < TAG_BITS:
+            return False
+        tag_ys, tag_xs = _tag_positions(height, width)
+        return np.array_equal(image[tag_ys, tag_xs, 0] & 1, WATERMARK_TAG)
+
+    def _parse_payload(self, watermark_text: str) -> Tuple[bool, Dict[str, Any]]:
+        try:
+            metadata = json.loads(watermark_text)
+        except ValueError:
+            return False, {}
+        # the tag is public, so the payload is attacker-controlled - any
+        # valid JSON scalar/array must read as "no watermark", not crash
+        if not isinstance(metadata, dict):
+            return False, {}
+        if metadata.get('tool') != modules.metadata.name:
+            return False, metadata
+        return True, metadata
+
+    def _embedding_positions(self, height: int, width: int, n: int) -> np.ndarray:
+        positions = self._pos_cache.get((height, width, n))
+        if positions is None:
+            # One bulk draw of flat indices; replace=False keeps positions unique
+            # so bits cannot silently overwrite each other near full capacity.
+            # The top of the flat range is reserved for the tag.
+            rng = np.random.default_rng(WATERMARK_SEED)
+            positions = rng.choice(height * width - TAG_BITS, size=n, replace=False)
+            self._pos_cache[(height, width, n)] = positions
+        return positions
+
+    def _string_to_binary(self, text: str, length: int) -> np.ndarray:
+        arr = np.frombuffer(text.encode('utf-8'), dtype=np.uint8)
+        bits = np.unpackbits(arr)
+        if bits.size < length:
+            bits = np.concatenate([bits, np.zeros(length - bits.size, dtype=np.uint8)])
+        return bits[:length]
+
+    def _binary_to_string(self, bits: np.ndarray) -> str:
+        text = np.packbits(bits.astype(np.uint8)).tobytes().decode('utf-8', errors='ignore')
+        return text.rstrip('\x00')
+
+    def _file_hash(self, filepath: Optional[str]) -> str:
+        # Live mode has no target file - fall back to hashing the identifier
+        if not filepath or not os.path.isfile(filepath):
+            return hashlib.sha256(str(filepath).encode('utf-8')).hexdigest()
+        stat = os.stat(filepath)
+        return _file_hash_cached(filepath, stat.st_mtime_ns, stat.st_size)
+
+
+_watermark_instance: Optional[DeepfakeWatermark] = None
+
+
+def get_watermark_instance(strength: Optional[float] = None) -> DeepfakeWatermark:
+    global _watermark_instance
+    if _watermark_instance is None:
+        # read the configured strength only when the singleton is first built
+        if strength is None:
+            strength = getattr(modules.globals, 'watermark_strength', 0.1)
+        _watermark_instance = DeepfakeWatermark(strength=strength)
+    return _watermark_instance
+
+
+def watermark_output(frame: Frame, source_path: Optional[str] = None, target_path: Optional[str] = None) -> Frame:
+    watermarker = get_watermark_instance()
+    if source_path is None:
+        source_path = modules.globals.source_path
+    if target_path is None:
+        target_path = modules.globals.target_path
+    watermark_text = watermarker.generate_watermark_data(source_path, target_path)
+    # the frame is not reused by callers, so skip the defensive copy
+    return watermarker.embed_watermark_dct(frame, watermark_text, inplace=True)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Self-test for the watermarking and output signing modules"""
+
+import argparse
+import os
+import sys
+import tempfile
+from typing import Optional
+
+import cv2
+import numpy as np
+
+# test artifacts are ephemeral - trade PNG size for much cheaper Deflate work
+PNG_FAST = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+
+from modules.digital_signature import DigitalSigner, SignatureManager
+from modules.watermark import get_watermark_instance, watermark_output
+
+# numba is optional - use it when installed, fall back to OpenCV otherwise
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+    @njit(cache=True, parallel=True)
+    def _fill_gradient(img: np.ndarray, height: int, width: int) -> None:
+        for i in prange(height):
+            for j in range(width):
+                img[i, j, 0] = np.uint8(i * 255 // (height - 1))
+                img[i, j, 1] = np.uint8(j * 255 // (width - 1))
+                img[i, j, 2] = np.uint8((img[i, j, 0] + np.uint16(img[i, j, 1])) // 2)
+
+
+def create_test_image(height: int = 480, width: int = 640) -> np.ndarray:
+    """Build a BGR gradient test image without any per-pixel Python loop"""
+    if njit is not None:
+        # compiled pixel loop; cache=True amortizes the compile across runs
+        image = np.empty((height, width, 3), dtype=np.uint8)
+        _fill_gradient(image, height, width)
+        return image
+    # expand tiny uint8 ramps with OpenCV - stays in uint8 end to end with
+    # no float intermediates
+    row_ramp = np.linspace(0, 255, height, dtype=np.uint8).reshape(-1, 1)
+    col_ramp = np.linspace(0, 255, width, dtype=np.uint8).reshape(1, -1)
+    b = cv2.resize(row_ramp, (width, height), interpolation=cv2.INTER_NEAREST)
+    g = cv2.resize(col_ramp, (width, height), interpolation=cv2.INTER_NEAREST)
+    r = cv2.addWeighted(b, 0.5, g, 0.5, 0)
+    return cv2.merge([b, g, r])
+
+
+def test_watermarking(work_dir: Optional[str] = None, verbose: bool = False) -> bool:
+    print('[TEST] invisible watermark')
+    test_image = create_test_image()
+    # the paths only feed the metadata hashes (generate_watermark_data hashes
+    # the identifier when no such file exists), so no PNG round-trip is needed
+    watermarked = watermark_output(test_image.copy(), source_path='in_memory_test', target_path='in_memory_test')
+
+    # two fused SIMD reductions, no HxWx3 diff temporary
+    avg_diff = cv2.norm(test_image, watermarked, cv2.NORM_L1) / float(test_image.size)
+    max_diff = int(cv2.norm(test_image, watermarked, cv2.NORM_INF))
+    print(f'  pixel change: avg {avg_diff:.4f}, max {max_diff}')
+
+    watermarker = get_watermark_instance()
+    is_watermarked, metadata = watermarker.verify_watermark(watermarked)
+    if not is_watermarked:
+        print('  FAIL: watermark not recovered from lossless image')
+        return False
+    print('  watermark recovered:')
+    # one write/flush instead of a syscall per metadata field
+    sys.stdout.write(''.join(f'    {key}: {value}\n' for key, value in metadata.items()))
+
+    if work_dir is not None:
+        cv2.imwrite(os.path.join(work_dir, 'test_original.png'), test_image, PNG_FAST)
+        cv2.imwrite(os.path.join(work_dir, 'test_watermarked.png'), watermarked, PNG_FAST)
+
+    # informational: LSB payloads do not survive lossy compression.
+    # encode/decode in memory - no disk round-trip needed for this check
+    ok, buf = cv2.imencode('.jpg', watermarked, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    compressed_image = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+    survives_jpeg, _ = watermarker.verify_watermark(compressed_image)
+    print(f'  survives JPEG q85: {survives_jpeg} (lossy compression is expected to destroy LSBs)')
+
+    print('  PASS')
+    return True
+
+
+def test_signature(work_dir: str, verbose: bool = False) -> bool:
+    print('[TEST] output signing')
+    key_dir = os.path.join(work_dir, 'keys')
+    os.makedirs(key_dir, exist_ok=True)
+    private_key_path = os.path.join(key_dir, 'private_key.pem')
+    public_key_path = os.path.join(key_dir, 'public_key.pem')
+
+    signer = DigitalSigner()
+    signer.generate_keypair()
+    signer.save_private_key(private_key_path)
+    signer.save_public_key(public_key_path)
+    if verbose:
+        print(f'  generated {signer.algorithm} keypair, fingerprint {signer.get_public_key_fingerprint()}')
+
+    image_path = os.path.join(work_dir, 'test_signed.png')
+    cv2.imwrite(image_path, create_test_image(), PNG_FAST)
+    sig_path = SignatureManager.create_signature_file(image_path, private_key_path)
+    if verbose:
+        print(f'  wrote signature file {sig_path}')
+
+    is_valid, sig_data = SignatureManager.verify_image_file(image_path, public_key_path)
+    if not is_valid:
+        print('  FAIL: signature did not verify on untouched file')
+        return False
+
+    # flip one byte and make sure verification fails
+    with open(image_path, 'r+b') as f:
+        f.seek(64)
+        byte = f.read(1)
+        f.seek(64)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    is_valid, _ = SignatureManager.verify_image_file(image_path, public_key_path)
+    if is_valid:
+        print('  FAIL: signature verified on a tampered file')
+        return False
+
+    print('  PASS')
+    return True
+
+
+def main() -> None:
+    program = argparse.ArgumentParser(description='run the watermark/signature self-tests')
+    program.add_argument('-v', '--verbose', help='print extra details', dest='verbose', action='store_true', default=False)
+    program.add_argument('--keep-artifacts', help='keep test images in the working directory', dest='keep_artifacts', action='store_true', default=False)
+    args = program.parse_args()
+
+    if args.keep_artifacts:
+        work_dir = os.getcwd()
+        results = [test_watermarking(work_dir, args.verbose), test_signature(work_dir, args.verbose)]
+    else:
+        # the watermark test runs fully in memory; only signing needs files
+        with tempfile.TemporaryDirectory() as work_dir:
+            results = [test_watermarking(None, args.verbose), test_signature(work_dir, args.verbose)]
+
+    if all(results):
+        print('All tests passed')
+    else:
+        print('Some tests FAILED')
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Verify .sig signatures created for Deep-Live-Cam outputs"""
+
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from modules.digital_signature import SignatureManager
+
+RULE = '=' * 60
+INVALID_HINTS = """\
+  Possible causes:
+    - the file was modified after signing
+    - the signature belongs to a different file
+    - the wrong public key was supplied
+"""
+
+
+def _verify_one(image_path: str, public_key_path: str) -> Tuple[str, Optional[bool], Any]:
+    """Verify a single image; module-level so it pickles for the process pool"""
+    if not Path(image_path).exists():
+        return image_path, None, 'file not found'
+    if not Path(SignatureManager.get_signature_path(image_path)).exists():
+        return image_path, None, 'no .sig file next to the image'
+    is_valid, sig_data = SignatureManager.verify_image_file(image_path, public_key_path)
+    return image_path, is_valid, sig_data
+
+
+def print_result(image_path: str, is_valid: Optional[bool], sig_data: Any, verbose: bool = False, quiet: bool = False) -> bool:
+    if quiet:
+        # machine-readable, one line per image, no formatting overhead
+        print(f'{"OK" if is_valid else "FAIL"}\t{image_path}')
+        return bool(is_valid)
+    if is_valid is None:
+        print(f'{image_path}: {sig_data}')
+        return False
+    # assemble the whole report and issue one write instead of a print
+    # (lock + possible flush) per line
+    if is_valid:
+        metadata = sig_data.get('metadata') or {}
+        lines = [
+            RULE,
+            '  SIGNATURE VALID',
+            RULE,
+            f'  image: {image_path}',
+            f'  algorithm: {sig_data.get("algorithm")}',
+            f'  key fingerprint: {sig_data.get("key_fingerprint")}',
+        ]
+        lines.extend(f'  {key:20s}: {value}' for key, value in metadata.items())
+        sys.stdout.write('\n'.join(lines) + '\n')
+    else:
+        report = (
+            f'{RULE}\n  SIGNATURE INVALID\n{RULE}\n'
+            f'  image: {image_path}\n  The file does not match its signature.\n'
+        )
+        if verbose:
+            report += INVALID_HINTS
+        sys.stdout.write(report)
+    return is_valid
+
+
+def main() -> None:
+    program = argparse.ArgumentParser(description='verify output signatures')
+    program.add_argument('images', help='signed images to verify', nargs='+')
+    program.add_argument('-k', '--public-key', help='public key PEM file', dest='public_key', default='keys/public_key.pem')
+    program.add_argument('-v', '--verbose', help='print extra details', dest='verbose', action='store_true', default=False)
+    program.add_argument('-q', '--quiet', help='print one OK/FAIL line per image', dest='quiet', action='store_true', default=False)
+    args = program.parse_args()
+
+    if not Path(args.public_key).exists():
+        print(f'{args.public_key}: public key not found')
+        raise SystemExit(1)
+
+    results = []
+    if len(args.images) == 1:
+        results.append(print_result(*_verify_one(args.images[0], args.public_key), args.verbose, args.quiet))
+    else:
+        # each verification is independent - fan out across cores; the
+        # cached key loader parses the PEM once per worker process
+        with ProcessPoolExecutor() as executor:
+            futures = [executor.submit(_verify_one, image_path, args.public_key) for image_path in args.images]
+            for future in as_completed(futures):
+                results.append(print_result(*future.result(), args.verbose, args.quiet))
+
+    if not all(results):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Check an image for the Deep-Live-Cam invisible watermark"""
+
+import argparse
+import functools
+import sys
+from typing import Optional
+
+import cv2
+
+from modules.typing import Frame
+from modules.watermark import get_watermark_instance
+
+# metadata fields that are identical across all outputs of one run; only
+# the timestamp varies per frame/image
+STATIC_KEYS = ('tool', 'version', 'source_hash', 'target_hash')
+
+
+@functools.lru_cache(maxsize=8)
+def _format_static(items: tuple) -> str:
+    return ''.join(f'  {key:20s}: {value}\n' for key, value in items)
+
+
+def print_result(image_path: str, is_watermarked: bool, metadata: dict, verbose: bool = False) -> bool:
+    if is_watermarked:
+        if not verbose:
+            print(f'{image_path}: watermark found')
+            return True
+        # the invariant block formats once per distinct signer/run, the
+        # variable tail is formatted fresh per image
+        static_items = tuple((key, metadata[key]) for key in STATIC_KEYS if key in metadata)
+        variable = ''.join(
+            f'  {key:20s}: {value}\n' for key, value in metadata.items() if key not in STATIC_KEYS
+        )
+        try:
+            static = _format_static(static_items)
+        except TypeError:
+            # the payload is attacker-controlled, so values may be unhashable
+            # (nested JSON) - fall back to formatting without the cache
+            static = ''.join(f'  {key:20s}: {value}\n' for key, value in static_items)
+        sys.stdout.write(f'{image_path}: watermark found\n' + static + variable)
+    else:
+        print(f'{image_path}: no watermark found')
+    return is_watermarked
+
+
+def _load_image(image_path: str) -> Optional[Frame]:
+    # skip EXIF rotation work - LSB positions are tied to the stored layout
+    return cv2.imread(image_path, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+
+
+def verify_image(image_path: str, verbose: bool = False) -> bool:
+    image = _load_image(image_path)
+    if image is None:
+        print(f'{image_path}: could not read image')
+        return False
+    is_watermarked, metadata = get_watermark_instance().verify_watermark(image)
+    return print_result(image_path, is_watermarked, metadata, verbose)
+
+
+def main() -> None:
+    program = argparse.ArgumentParser(description='check an image for the invisible watermark')
+    program.add_argument('images', help='images to check', nargs='+')
+    program.add_argument('-v', '--verbose', help='print extra details', dest='verbose', action='store_true', default=False)
+    args = program.parse_args()
+
+    if len(args.images) == 1:
+        results = [verify_image(args.images[0], args.verbose)]
+    else:
+        # batch mode shares one position table per image geometry
+        results = []
+        paths = []
+        images = []
+        for image_path in args.images:
+            image = _load_image(image_path)
+            if image is None:
+                print(f'{image_path}: could not read image')
+                results.append(False)
+            else:
+                paths.append(image_path)
+                images.append(image)
+        for image_path, (is_watermarked, metadata) in zip(paths, get_watermark_instance().verify_batch(images)):
+            results.append(print_result(image_path, is_watermarked, metadata, args.verbose))
+    if not all(results):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()